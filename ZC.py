@@ -1,12 +1,169 @@
 import hashlib
+import sys
 import json
+import collections
+import struct
 import time
+import itertools
+import multiprocessing
+import subprocess
 from datetime import datetime
-import qrcode
-from PIL import Image
+import segno
 import os
 
+def _pick_sha256():
+    # Prefer the OpenSSL-backed constructor: its runtime dispatcher picks the
+    # CPU's SHA extensions (SHA-NI / ARMv8 crypto) when available. Fall back
+    # to hashlib's builtin on interpreters compiled without OpenSSL.
+    try:
+        from _hashlib import openssl_sha256
+        return openssl_sha256
+    except ImportError:
+        return hashlib.sha256
+
+_sha256 = _pick_sha256()
+
+try:
+    import orjson
+except ImportError:
+    # Optional C serializer; the stdlib json module covers the same calls.
+    orjson = None
+
+def _json_dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+# How many levels below the root to cache per block: proofs stop at the
+# cached layer, saving that many hashes (and proof elements) per check.
+_MERKLE_CACHE_DEPTH = 3
+
+def _merkle_levels(tx_hashes):
+    # Pairwise-hash the transaction hashes up to a single root, duplicating
+    # the last node on odd-sized levels (Bitcoin-style). Returns every level,
+    # leaves first, root level last.
+    if not tx_hashes:
+        return [[_sha256(b"").digest()]]
+    levels = [tx_hashes]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        if len(level) % 2:
+            level = level + [level[-1]]
+        levels.append([_sha256(level[i] + level[i + 1]).digest()
+                       for i in range(0, len(level), 2)])
+    return levels
+
+def _encode_nft(nft_data):
+    # nft_data is a small optional dict; compact JSON with sorted keys keeps
+    # its encoding canonical, and this runs once per transaction. The
+    # fallback matches orjson's output byte for byte so hashes do not depend
+    # on which serializer is installed.
+    if nft_data is None:
+        return b""
+    if orjson is not None:
+        return orjson.dumps(nft_data, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(nft_data, sort_keys=True, separators=(",", ":"),
+                      ensure_ascii=False).encode()
+
+def _encode_tx(sender, recipient, amount, nft_data, timestamp):
+    # Canonical transaction encoding. The variable-length fields are
+    # length-prefixed so the encoding is injective: a delimiter could appear
+    # inside an address or the nft payload and let two different transactions
+    # encode — and therefore hash — identically. The sender carries a tag
+    # byte so None (system/reward transactions) stays distinct from the
+    # empty string.
+    if sender is None:
+        sender_field = b"\x00"
+    else:
+        sender_bytes = sender.encode()
+        sender_field = b"\x01" + struct.pack("<I", len(sender_bytes)) + sender_bytes
+    recipient_bytes = recipient.encode()
+    nft_bytes = _encode_nft(nft_data)
+    return (sender_field
+            + struct.pack("<I", len(recipient_bytes)) + recipient_bytes
+            + struct.pack("<d", amount)
+            + struct.pack("<I", len(nft_bytes)) + nft_bytes
+            + struct.pack("<d", timestamp))
+
+def _difficulty_threshold(difficulty):
+    # A hash meets the difficulty exactly when its digest, read as a 256-bit
+    # big-endian integer, is below this bound (one hex nibble per level).
+    return 1 << (256 - 4 * difficulty)
+
+# Nonces scanned in-process before mining fans out to worker processes, and
+# the size of each range handed to a worker. Easy difficulties almost always
+# solve within the serial scan, so the pool only spins up when it will pay
+# for its own startup.
+_SERIAL_NONCES = 1 << 16
+_MINE_CHUNK = 1 << 16
+
+# Blocks verified per task when validation fans out to worker processes;
+# chains at or below this size are verified in-process.
+_VALIDATE_CHUNK = 1024
+
+def _header_prefix(index, merkle_root, timestamp, previous_hash):
+    # The fixed-size block header bytes that precede the nonce, shared by
+    # block hashing and chain verification.
+    return (index.to_bytes(8, 'little')
+            + merkle_root
+            + struct.pack("<d", timestamp)
+            + previous_hash.encode())
+
+def _verify_chunk(payloads):
+    # Recompute each block's hash from the live field values it was built
+    # from — transaction hashes from their fields, the Merkle root from
+    # those, then the header — and compare against the stored hex form, so
+    # tampering with any field is caught, not just hash or nonce edits.
+    for index, tx_fields, timestamp, previous_hash, nonce, expected in payloads:
+        leaves = [_sha256(_encode_tx(*fields)).digest() for fields in tx_fields]
+        root = _merkle_levels(leaves)[-1][0]
+        prefix = _header_prefix(index, root, timestamp, previous_hash)
+        if _sha256(prefix + nonce.to_bytes(8, 'little')).hexdigest() != expected:
+            return False
+    return True
+
+def _make_calc(prefix):
+    # Specialize the block's hash function at runtime: the fixed header
+    # bytes are baked into the generated source as a literal, so every call
+    # is one C hash call over header+nonce with no attribute lookups, method
+    # dispatch or midstate copies left in Python.
+    ns = {"_sha256": _sha256}
+    exec("def _calc(n):\n"
+         "    return _sha256(%r + n.to_bytes(8, 'little')).digest()\n" % prefix,
+         ns)
+    return ns["_calc"]
+
+def _search_nonce(calc, nonce, end, threshold):
+    # Mining kernel, lifted to module level so every name in the hot loop is
+    # a local: no attribute lookups or bound-method dispatch per attempt.
+    # Compares the raw digest against the precomputed threshold so failed
+    # attempts never pay for hex encoding, and tries two nonces per iteration
+    # so a second hash stream is always in flight. Returns the winning nonce,
+    # or None if the range [nonce, end) is exhausted.
+    from_bytes = int.from_bytes
+    while nonce < end:
+        if from_bytes(calc(nonce), 'big') < threshold:
+            return nonce
+        if from_bytes(calc(nonce + 1), 'big') < threshold:
+            return nonce + 1
+        nonce += 2
+    return None
+
+def _mine_range(args):
+    # Worker-side search over one nonce range. The specialized hash function
+    # is regenerated from the prefix bytes because code objects do not cross
+    # process boundaries.
+    prefix, start, end, threshold = args
+    return _search_nonce(_make_calc(prefix), start, end, threshold)
+
 class Block:
+    # Slots drop the per-object __dict__: blocks get denser in memory and
+    # attribute access in the hot paths becomes a fixed slot index instead of
+    # a dict probe.
+    __slots__ = ("index", "transactions", "timestamp", "previous_hash",
+                 "nonce", "hash", "_merkle_root", "_merkle_levels", "_calc", "_prefix",
+                 "_hash_bytes", "_prev_bytes")
+
     def __init__(self, index, transactions, timestamp, previous_hash, nonce=0):
         self.index = index
         self.transactions = transactions
@@ -15,23 +172,95 @@ class Block:
         self.nonce = nonce
         self.hash = self.calculate_hash()
 
+    def _build_hash_state(self):
+        # The block hash covers a fixed-size header: index, Merkle root of
+        # the transaction hashes, timestamp and previous hash. Its cost no
+        # longer grows with the number of transactions, and the nonce goes
+        # last so each mining attempt only hashes header+nonce. The prefix
+        # bytes are kept so worker processes can regenerate the function on
+        # their side. The Merkle leaves come from each transaction's
+        # recomputed hash, so a rebuild reflects the live field values.
+        levels = _merkle_levels([bytes.fromhex(tx.calculate_hash())
+                                 for tx in self.transactions])
+        self._merkle_root = levels[-1][0]
+        # Keep the tree from the leaves up to the layer _MERKLE_CACHE_DEPTH
+        # below the root (or the whole tree when it is shallower), so
+        # inclusion proofs can be generated and checked against the cached
+        # layer without rehashing the top of the tree.
+        cut = max(0, len(levels) - 1 - _MERKLE_CACHE_DEPTH)
+        self._merkle_levels = levels[:cut + 1]
+        self._prefix = _header_prefix(self.index, self._merkle_root,
+                                      self.timestamp, self.previous_hash)
+        self._calc = _make_calc(self._prefix)
+
     def calculate_hash(self):
-        block_string = json.dumps({
+        # Public recompute-from-fields entry point: rebuild the cached hash
+        # state first so the result reflects the block's current contents,
+        # not what they were at construction. Mining keeps using the cached
+        # _calc directly inside its loop.
+        self._build_hash_state()
+        return self._calc(self.nonce).hex()
+
+    def get_merkle_proof(self, index):
+        # Sibling hashes from the transaction's leaf up to the cached layer;
+        # odd-sized levels duplicate their last node, matching construction.
+        proof = []
+        for level in self._merkle_levels[:-1]:
+            sibling = index ^ 1
+            proof.append(level[sibling] if sibling < len(level) else level[index])
+            index //= 2
+        return proof
+
+    def verify_tx_inclusion(self, tx_hash, index, proof):
+        # Rebuild the path from the leaf and compare against the cached
+        # layer, so the top _MERKLE_CACHE_DEPTH levels never get rehashed.
+        node = bytes.fromhex(tx_hash)
+        for sibling in proof:
+            if index % 2:
+                node = _sha256(sibling + node).digest()
+            else:
+                node = _sha256(node + sibling).digest()
+            index //= 2
+        cached = self._merkle_levels[-1]
+        return index < len(cached) and cached[index] == node
+
+    def to_dict(self):
+        return {
             "index": self.index,
             "transactions": [tx.to_dict() for tx in self.transactions],
             "timestamp": self.timestamp,
             "previous_hash": self.previous_hash,
-            "nonce": self.nonce
-        }, sort_keys=True).encode()
-        return hashlib.sha256(block_string).hexdigest()
+            "nonce": self.nonce,
+            "hash": self.hash
+        }
 
     def mine_block(self, difficulty):
-        while self.hash[:difficulty] != '0' * difficulty:
-            self.nonce += 1
-            self.hash = self.calculate_hash()
+        threshold = _difficulty_threshold(difficulty)
+        nonce = _search_nonce(self._calc, self.nonce,
+                              self.nonce + _SERIAL_NONCES, threshold)
+        if nonce is None:
+            nonce = self._mine_parallel(self.nonce + _SERIAL_NONCES, threshold)
+        self.nonce = nonce
+        self.hash = self.calculate_hash()
         print(f"Block mined: {self.hash}")
 
+    def _mine_parallel(self, start, threshold):
+        # The search space is split into disjoint ranges scanned by one
+        # worker per core; ranges keep being dispatched until one returns a
+        # winning nonce, then the pool is torn down, cancelling the rest.
+        ranges = ((self._prefix, s, s + _MINE_CHUNK, threshold)
+                  for s in itertools.count(start, _MINE_CHUNK))
+        with multiprocessing.Pool() as pool:
+            for nonce in pool.imap(_mine_range, ranges):
+                if nonce is not None:
+                    return nonce
+
 class Transaction:
+    # Transactions are the bulk of a long-lived chain's heap; slots save the
+    # per-object __dict__ (dozens of bytes each) and speed field access.
+    __slots__ = ("sender", "recipient", "amount", "nft_data", "timestamp",
+                 "hash", "_dict")
+
     def __init__(self, sender, recipient, amount, nft_data=None):
         self.sender = sender
         self.recipient = recipient
@@ -39,19 +268,9 @@ class Transaction:
         self.nft_data = nft_data  # NFT metadata (name, description, etc.)
         self.timestamp = time.time()
         self.hash = self.calculate_hash()
-
-    def calculate_hash(self):
-        transaction_string = json.dumps({
-            "sender": self.sender,
-            "recipient": self.recipient,
-            "amount": self.amount,
-            "nft_data": self.nft_data,
-            "timestamp": self.timestamp
-        }, sort_keys=True).encode()
-        return hashlib.sha256(transaction_string).hexdigest()
-
-    def to_dict(self):
-        return {
+        # Fields never change after construction, so the dict form is built
+        # exactly once.
+        self._dict = {
             "sender": self.sender,
             "recipient": self.recipient,
             "amount": self.amount,
@@ -60,13 +279,37 @@ class Transaction:
             "hash": self.hash
         }
 
+    def calculate_hash(self):
+        # Canonical byte encoding of the fields; much cheaper than running
+        # them through the JSON state machine with sorted keys.
+        encoded = _encode_tx(self.sender, self.recipient, self.amount,
+                             self.nft_data, self.timestamp)
+        return _sha256(encoded).hexdigest()
+
+    def to_dict(self):
+        return self._dict
+
 class ZenChain:
-    def __init__(self):
-        self.chain = [self.create_genesis_block()]
+    def __init__(self, log_path="blocks.log"):
+        # Append-only on-disk record of every sealed block (one JSON object
+        # per line); pass None to keep the chain purely in memory. Queries go
+        # through the in-memory indices, so the log is write-only in normal
+        # operation and the OS page cache manages it.
+        self.log_path = log_path
         self.difficulty = 2
         self.pending_transactions = []
         self.mining_reward = 100
         self.nft_collections = {}
+        # Incremental address index: balances and per-address transaction
+        # lists are maintained as blocks are mined, so queries never have to
+        # rescan the whole chain.
+        self._tx_log = []
+        self._by_addr = collections.defaultdict(list)
+        self._balance = collections.defaultdict(float)
+        # Trusted digests of each block's hash, frozen at append time.
+        self._hash_snapshots = []
+        self.chain = [self.create_genesis_block()]
+        self._seal_block(self.chain[0])
 
     def create_genesis_block(self):
         return Block(0, [], time.time(), "0")
@@ -80,7 +323,9 @@ class ZenChain:
         
         print("Block successfully mined!")
         self.chain.append(block)
-        
+        self._seal_block(block)
+        self._index_block(block)
+
         self.pending_transactions = [
             Transaction(None, mining_reward_address, self.mining_reward)
         ]
@@ -88,38 +333,83 @@ class ZenChain:
     def create_transaction(self, transaction):
         self.pending_transactions.append(transaction)
 
+    def _seal_block(self, block):
+        # Freeze the raw digest forms once, so later comparisons are 32-byte
+        # memcmps instead of 64-char hex string compares. The genesis block's
+        # previous_hash is not hex, so its raw form stays unset.
+        block._hash_bytes = bytes.fromhex(block.hash)
+        if len(block.previous_hash) == 64:
+            block._prev_bytes = bytes.fromhex(block.previous_hash)
+        else:
+            block._prev_bytes = None
+        self._hash_snapshots.append(block._hash_bytes)
+        if self.log_path:
+            with open(self.log_path, "a") as f:
+                f.write(_json_dumps(block.to_dict()) + "\n")
+
+    def _index_block(self, block):
+        for trans in block.transactions:
+            self._tx_log.append(trans)
+            i = len(self._tx_log) - 1
+            self._by_addr[trans.sender].append(i)
+            if trans.recipient != trans.sender:
+                self._by_addr[trans.recipient].append(i)
+            self._balance[trans.sender] -= trans.amount
+            self._balance[trans.recipient] += trans.amount
+
     def get_balance(self, address):
-        balance = 0
-        for block in self.chain:
-            for trans in block.transactions:
-                if trans.sender == address:
-                    balance -= trans.amount
-                if trans.recipient == address:
-                    balance += trans.amount
-        return balance
+        # .get keeps queries side-effect-free: indexing the defaultdict would
+        # insert an entry for every unknown address ever asked about.
+        return self._balance.get(address, 0.0)
 
     def get_transaction_history(self, address):
-        history = []
-        for block in self.chain:
-            for trans in block.transactions:
-                if trans.sender == address or trans.recipient == address:
-                    history.append(trans.to_dict())
-        return history
+        return [self._tx_log[i].to_dict() for i in self._by_addr.get(address, ())]
 
     def is_chain_valid(self):
-        for i in range(1, len(self.chain)):
-            current_block = self.chain[i]
-            previous_block = self.chain[i-1]
-            
-            if current_block.hash != current_block.calculate_hash():
-                return False
-            
-            if current_block.previous_hash != previous_block.hash:
-                return False
-        
-        return True
+        # Cheap pass first: stored hashes against the snapshots frozen at
+        # append time and the chain links as raw 32-byte digests, rejecting
+        # obvious tampering before any hashing happens. A chain that grew or
+        # shrank without going through _seal_block cannot match its
+        # snapshots, so reject it up front.
+        if len(self.chain) != len(self._hash_snapshots):
+            return False
+        try:
+            for i in range(1, len(self.chain)):
+                current_block = self.chain[i]
+                previous_block = self.chain[i-1]
+
+                if bytes.fromhex(current_block.hash) != self._hash_snapshots[i]:
+                    return False
+
+                if current_block._prev_bytes != previous_block._hash_bytes:
+                    return False
+        except (ValueError, AttributeError):
+            # A stored hash was tampered into something that is not hex, or
+            # a block that never went through _seal_block was swapped in.
+            return False
+
+        # Content pass: recompute every block hash from the live field
+        # values, not the caches frozen at construction. The recomputations
+        # are independent, so long chains are split into chunks verified by
+        # one worker per core; short chains stay in-process where the pool
+        # would cost more than the hashing.
+        payloads = [(block.index,
+                     [(tx.sender, tx.recipient, tx.amount, tx.nft_data,
+                       tx.timestamp) for tx in block.transactions],
+                     block.timestamp, block.previous_hash, block.nonce,
+                     block.hash)
+                    for block in self.chain]
+        if len(payloads) <= _VALIDATE_CHUNK:
+            return _verify_chunk(payloads)
+        chunks = [payloads[i:i + _VALIDATE_CHUNK]
+                  for i in range(0, len(payloads), _VALIDATE_CHUNK)]
+        with multiprocessing.Pool() as pool:
+            return all(pool.imap_unordered(_verify_chunk, chunks))
 
     def create_nft(self, owner_address, nft_id, nft_name, nft_description):
+        # Intern the id so every later registry probe for it short-circuits
+        # on pointer equality instead of rehashing and comparing the string.
+        nft_id = sys.intern(nft_id)
         if nft_id in self.nft_collections:
             print("NFT already exists!")
             return False
@@ -143,6 +433,7 @@ class ZenChain:
         return True
 
     def transfer_nft(self, sender, recipient, nft_id):
+        nft_id = sys.intern(nft_id)
         if nft_id not in self.nft_collections:
             print("NFT does not exist!")
             return False
@@ -165,17 +456,9 @@ class ZenChain:
         return True
 
     def generate_qr_code(self, data, filename="qrcode.png"):
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        img.save(filename)
+        # segno encodes and writes the PNG directly, with no intermediate
+        # PIL image to build and rasterize.
+        segno.make(data, error='L').save(filename, scale=10, border=4)
         print(f"QR code saved as {filename}")
         return filename
 
@@ -256,13 +539,18 @@ def main():
                 qr_data["amount"] = float(amount)
             
             filename = f"payment_qr_{int(time.time())}.png"
-            zenchain.generate_qr_code(json.dumps(qr_data), filename)
+            zenchain.generate_qr_code(_json_dumps(qr_data), filename)
             print(f"Payment QR code generated: {filename}")
             
-            # Display the QR code if possible
+            # Display the QR code if possible: hand the file straight to the
+            # OS viewer instead of decoding the PNG through PIL first
             try:
-                img = Image.open(filename)
-                img.show()
+                if sys.platform.startswith("win"):
+                    os.startfile(filename)
+                elif sys.platform == "darwin":
+                    subprocess.Popen(["open", filename])
+                else:
+                    subprocess.Popen(["xdg-open", filename])
             except:
                 pass
         